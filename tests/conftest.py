@@ -0,0 +1,31 @@
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import databases
+import pytest
+
+from server_main import InstrumentedDatabase
+
+
+class SQLiteAsMySQL(InstrumentedDatabase):
+    """在 sqlite 上执行后台任务中的 MySQL 语句: 去掉行锁, 改写 DATE_SUB 与 CREATE TABLE ... LIKE"""
+
+    REWRITES = [
+        (re.compile(r"\s+FOR UPDATE( OF \w+)?( SKIP LOCKED)?"), ""),
+        (re.compile(r"DATE_SUB\(:now, INTERVAL (.+?) MINUTE\)"), r"datetime(:now, '-' || (\1) || ' minutes')"),
+        (re.compile(r"CREATE TABLE IF NOT EXISTS (\w+) LIKE (\w+)"), r"CREATE TABLE IF NOT EXISTS \1 AS SELECT * FROM \2 WHERE 0"),
+    ]
+
+    async def _run(self, query_name, method, query, values, count_rows):
+        for pattern, replacement in self.REWRITES:
+            query = pattern.sub(replacement, query)
+        return await super()._run(query_name, method, query, values, count_rows)
+
+
+@pytest.fixture
+def mysql_on_sqlite(tmp_path):
+    """未连接的库, 测试在自己的事件循环中 connect"""
+    return SQLiteAsMySQL(databases.Database(f"sqlite:///{tmp_path / 'mysql.db'}"), name="test")
@@ -0,0 +1,128 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import server_main
+from benchmark_server import apply_schema
+from server_main import CreditAggregator, OrderArchiver, OrderSweeper, build_in_clause
+
+OLD = datetime.now().replace(microsecond=0) - timedelta(days=server_main.ARCHIVE_AFTER_DAYS + 1)
+
+
+async def prepare(db):
+    await db.connect()
+    await apply_schema(db, "sqlite://")
+    await db.execute(OrderSweeper.CREATE_TABLE)
+    await db.execute(OrderSweeper.CREATE_EXPIRED_TABLE)
+    for statement in OrderArchiver.CREATE_TABLES:
+        await db.execute(statement)
+
+
+async def insert_order(db, status, updated_at=OLD, runner="r"):
+    return await db.execute(
+        "INSERT INTO orders (title, price, type, status, location, destination, publisherId, publisherName, "
+        "runnerId, createdAt, updatedAt) VALUES ('t', 1, 'OTHER', :status, 'a', 'b', 'p', 'n', :runner, :at, :at)",
+        {"status": status, "runner": runner, "at": updated_at},
+    )
+
+
+async def ids(db, table, column="orderId"):
+    return sorted(r[0] for r in await db.fetch_all(f"SELECT {column} FROM {table}"))
+
+
+async def aggregate(db, users):
+    in_clause, values = build_in_clause("u", users)
+    totals = {}
+    for suffix in ("", "_archive"):
+        query = CreditAggregator.AGGREGATE.format(suffix=suffix, users=in_clause)
+        for row in await db.fetch_all(query, values):
+            counts = totals.setdefault(row["userId"], dict.fromkeys(CreditAggregator.COUNTERS, 0))
+            for c in CreditAggregator.COUNTERS:
+                counts[c] += int(row[c] or 0)
+    return totals
+
+
+def test_expired_and_overdue_flags_move_with_their_orders(mysql_on_sqlite):
+    async def run():
+        db = mysql_on_sqlite
+        await prepare(db)
+        try:
+            expired = await insert_order(db, "CANCELLED", runner=None)
+            cancelled = await insert_order(db, "CANCELLED", runner=None)
+            overdue = await insert_order(db, "COMPLETED")
+            recent = await insert_order(db, "COMPLETED", updated_at=datetime.now().replace(microsecond=0))
+            await db.execute("INSERT INTO expired_orders VALUES (:id, :at)", {"id": expired, "at": OLD})
+            for order_id in (overdue, recent):
+                await db.execute("INSERT INTO overdue_orders VALUES (:id, :at)", {"id": order_id, "at": OLD})
+            before = await aggregate(db, ["p", "r"])
+
+            assert await OrderArchiver(db).archive() == 3
+
+            assert await ids(db, "expired_orders") == []
+            assert await ids(db, "expired_orders_archive") == [expired]
+            assert await ids(db, "overdue_orders") == [recent]
+            assert await ids(db, "overdue_orders_archive") == [overdue]
+            assert await ids(db, "orders_archive", "id") == sorted([expired, cancelled, overdue])
+            # 过期取消仍不计入发布者取消, 超时仍计入跑腿员
+            assert await aggregate(db, ["p", "r"]) == before
+            assert before["p"]["cancelled"] == 1 and before["r"]["overdue"] == 2
+        finally:
+            await db.disconnect()
+
+    asyncio.run(run())
+
+
+def test_flags_of_previously_archived_orders_are_moved_on_start(mysql_on_sqlite):
+    async def run():
+        db = mysql_on_sqlite
+        await prepare(db)
+        try:
+            archived = await insert_order(db, "CANCELLED", runner=None)
+            hot = await insert_order(db, "CANCELLED", updated_at=datetime.now().replace(microsecond=0), runner=None)
+            await db.execute("INSERT INTO orders_archive SELECT * FROM orders WHERE id = :id", {"id": archived})
+            await db.execute("DELETE FROM orders WHERE id = :id", {"id": archived})
+            for order_id in (archived, hot):
+                await db.execute("INSERT INTO expired_orders VALUES (:id, :at)", {"id": order_id, "at": OLD})
+
+            archiver = OrderArchiver(db)
+            await archiver.move_archived_flags()
+            await archiver.move_archived_flags()
+
+            assert await ids(db, "expired_orders") == [hot]
+            assert await ids(db, "expired_orders_archive") == [archived]
+        finally:
+            await db.disconnect()
+
+    asyncio.run(run())
+
+
+def test_archive_moves_old_finished_orders_and_their_messages(mysql_on_sqlite, monkeypatch):
+    monkeypatch.setattr(server_main, "ARCHIVE_BATCH_SIZE", 2)
+
+    async def run():
+        db = mysql_on_sqlite
+        await prepare(db)
+        try:
+            finished = [await insert_order(db, status) for status in ("COMPLETED", "CANCELLED", "COMPLETED")]
+            active = await insert_order(db, "IN_PROGRESS")
+            recent = await insert_order(db, "COMPLETED", updated_at=datetime.now().replace(microsecond=0))
+            for order_id in finished + [active, recent]:
+                await db.execute(
+                    "INSERT INTO chat_messages (orderId, senderId, content, messageType, timestamp, isRead) "
+                    "VALUES (:id, 'p', 'hi', 'CHAT', :at, 1)", {"id": order_id, "at": OLD},
+                )
+            # 上次归档中途失败时已复制但未删除的行: 不能重复复制, 这次要从热表删除
+            await db.execute("INSERT INTO orders_archive SELECT * FROM orders WHERE id = :id", {"id": finished[0]})
+
+            archiver = OrderArchiver(db)
+            assert await archiver.archive() == 3
+            assert await archiver.archive() == 0
+
+            assert await ids(db, "orders", "id") == [active, recent]
+            assert await ids(db, "orders_archive", "id") == finished
+            assert await ids(db, "chat_messages") == [active, recent]
+            assert await ids(db, "chat_messages_archive") == finished
+            assert archiver.archived_orders == 3
+        finally:
+            await db.disconnect()
+
+    asyncio.run(run())
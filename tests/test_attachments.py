@@ -0,0 +1,119 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import databases
+import pytest
+
+import server_main
+from server_main import AttachmentStore, InstrumentedDatabase, _create_part, _finalize, _write_at, parse_range_header
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=900-5000", (900, 999)),
+    (" bytes=1-1 ", (1, 1)),
+])
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=-", "bytes=1000-", "bytes=5-4", "items=0-1", "bytes=0-1,5-6", "bytes=a-b"])
+def test_parse_range_header_unsatisfiable(header):
+    assert parse_range_header(header, 1000) is None
+
+
+def test_finalize_is_idempotent(tmp_path):
+    part, final = tmp_path / "a.part", tmp_path / "a"
+    part.write_bytes(b"data")
+    _finalize(str(part), str(final))
+    _finalize(str(part), str(final))
+    assert final.read_bytes() == b"data"
+    with pytest.raises(FileNotFoundError):
+        _finalize(str(tmp_path / "b.part"), str(tmp_path / "b"))
+
+
+def test_chunk_lease_serialises_uploads(tmp_path):
+    async def run():
+        db = InstrumentedDatabase(databases.Database(f"sqlite:///{tmp_path / 'att.db'}"), name="test")
+        await db.connect()
+        try:
+            await db.execute(
+                "CREATE TABLE chat_attachments (id TEXT PRIMARY KEY, uploaderId TEXT, status TEXT, size INT, "
+                "receivedBytes INT, uploadLease TEXT, leaseExpiresAt TIMESTAMP, createdAt TIMESTAMP)"
+            )
+            await db.execute(
+                "INSERT INTO chat_attachments VALUES ('a1', 'u1', 'UPLOADING', 10, 0, NULL, NULL, :now)",
+                {"now": datetime.now()},
+            )
+            store = AttachmentStore(db, str(tmp_path))
+
+            lease = await store.acquire_lease("a1", "u1", 0)
+            assert lease is not None
+            # 同一时刻只有一个请求能取得租约, 其它用户也不能取得
+            assert await store.acquire_lease("a1", "u1", 0) is None
+            assert await store.acquire_lease("a1", "u2", 0) is None
+
+            assert await store.commit_chunk("a1", lease, 0, 4) is True
+            assert await db.fetch_val("SELECT receivedBytes FROM chat_attachments WHERE id = 'a1'") == 4
+            # 过期的 offset 不能再写
+            assert await store.acquire_lease("a1", "u1", 0) is None
+            lease = await store.acquire_lease("a1", "u1", 4)
+            await store.release_lease("a1", lease)
+            assert await store.commit_chunk("a1", lease, 4, 10) is False
+        finally:
+            await db.disconnect()
+
+    asyncio.run(run())
+
+
+def test_write_does_not_recreate_removed_part_file(tmp_path):
+    part = tmp_path / "a.part"
+    _create_part(str(part))
+    _write_at(str(part), 0, b"abc")
+    part.unlink()
+    with pytest.raises(FileNotFoundError):
+        _write_at(str(part), 3, b"def")
+    assert not part.exists()
+
+
+def test_cleanup_skips_uploads_with_live_lease(tmp_path):
+    async def run():
+        db = InstrumentedDatabase(databases.Database(f"sqlite:///{tmp_path / 'att.db'}"), name="test")
+        await db.connect()
+        try:
+            await db.execute(
+                "CREATE TABLE chat_attachments (id TEXT PRIMARY KEY, uploaderId TEXT, status TEXT, size INT, "
+                "receivedBytes INT, uploadLease TEXT, leaseExpiresAt TIMESTAMP, createdAt TIMESTAMP)"
+            )
+            old = datetime.now() - timedelta(days=2)
+            for attachment_id, lease, expires in [
+                ("idle", None, None),
+                ("writing", "l1", datetime.now() + timedelta(minutes=5)),
+                ("stale", "l2", datetime.now() - timedelta(minutes=5)),
+            ]:
+                await db.execute(
+                    "INSERT INTO chat_attachments VALUES (:id, 'u1', 'UPLOADING', 10, 0, :lease, :expires, :created)",
+                    {"id": attachment_id, "lease": lease, "expires": expires, "created": old},
+                )
+            store = AttachmentStore(db, str(tmp_path))
+            for attachment_id in ("idle", "writing", "stale"):
+                _create_part(store.path(attachment_id, ".part"))
+
+            assert await store.remove_abandoned() == 2
+            remaining = await db.fetch_all("SELECT id FROM chat_attachments")
+            assert [r["id"] for r in remaining] == ["writing"]
+            assert (tmp_path / "writing.part").exists() and not (tmp_path / "idle.part").exists()
+        finally:
+            await db.disconnect()
+
+    asyncio.run(run())
+
+
+def test_multi_worker_requires_shared_attachment_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(server_main, "WORKERS", 4)
+    monkeypatch.setattr(server_main, "ATTACHMENT_DIR_SHARED", False)
+    with pytest.raises(RuntimeError):
+        asyncio.run(AttachmentStore(db=None, root=str(tmp_path)).start())
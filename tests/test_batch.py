@@ -0,0 +1,23 @@
+import pytest
+from fastapi import HTTPException
+
+import server_main
+from server_main import parse_id_list
+
+
+def test_parse_id_list_dedupes_and_keeps_order():
+    assert parse_id_list("3, 1,3,2,,1") == [3, 1, 2]
+
+
+@pytest.mark.parametrize("ids", ["", " , ", "1,a", "1.5"])
+def test_parse_id_list_rejects_invalid(ids):
+    with pytest.raises(HTTPException) as exc:
+        parse_id_list(ids)
+    assert exc.value.status_code == 400
+
+
+def test_parse_id_list_enforces_limit(monkeypatch):
+    monkeypatch.setattr(server_main, "BATCH_FETCH_MAX_IDS", 3)
+    assert parse_id_list("1,2,3") == [1, 2, 3]
+    with pytest.raises(HTTPException):
+        parse_id_list("1,2,3,4")
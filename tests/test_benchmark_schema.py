@@ -0,0 +1,78 @@
+import asyncio
+import random
+
+import databases
+
+from benchmark_server import CREATE_INDEX, SCHEMA, Workload, apply_schema, clear_tables
+
+
+class FakeMySQL:
+    """只记录执行的语句; information_schema 查询返回已存在的索引"""
+
+    def __init__(self, existing):
+        self.existing = existing
+        self.executed = []
+
+    async def fetch_val(self, query, values):
+        return int(values["index"] in self.existing)
+
+    async def execute(self, query):
+        self.executed.append(query)
+
+
+def test_reseed_skips_existing_mysql_indexes():
+    async def run():
+        db = FakeMySQL(existing={"idx_orders_publisher"})
+        await apply_schema(db, "mysql://bench")
+        indexes = [CREATE_INDEX.match(q).group(1) for q in db.executed if CREATE_INDEX.match(q)]
+        assert "idx_orders_publisher" not in indexes
+        assert "idx_orders_runner" in indexes
+        assert len(db.executed) == len(SCHEMA) - 1
+
+    asyncio.run(run())
+
+
+def test_sqlite_schema_can_be_applied_twice(tmp_path):
+    async def run():
+        db = databases.Database(f"sqlite:///{tmp_path / 'bench.db'}")
+        await db.connect()
+        try:
+            await apply_schema(db, str(db.url))
+            await apply_schema(db, str(db.url))
+        finally:
+            await db.disconnect()
+
+    asyncio.run(run())
+
+
+def test_sqlite_reseed_clears_tables_and_restarts_ids(tmp_path):
+    async def run():
+        db = databases.Database(f"sqlite:///{tmp_path / 'bench.db'}")
+        await db.connect()
+        try:
+            url = str(db.url)
+            await apply_schema(db, url)
+            for _ in range(2):
+                await clear_tables(db, url)
+                await db.execute(
+                    "INSERT INTO users (id, studentId, password_hash, name, createdAt) "
+                    "VALUES ('u1', 'B00000001', 'x', 'n', '2024-01-01')"
+                )
+                await db.execute(
+                    "INSERT INTO orders (title, price, type, status, location, destination, publisherId, "
+                    "publisherName, createdAt, updatedAt) "
+                    "VALUES ('t', 1, 'OTHER', 'PENDING', 'a', 'b', 'u1', 'n', '2024-01-01', '2024-01-01')"
+                )
+            assert await db.fetch_val("SELECT COUNT(*) FROM users") == 1
+            assert await db.fetch_val("SELECT MAX(id) FROM orders") == 1
+        finally:
+            await db.disconnect()
+
+    asyncio.run(run())
+
+
+def test_read_only_workload_drops_accept_storm():
+    meta = {"users": 10, "orders": 100}
+    workload = Workload(None, None, meta, None, random.Random(0), writes=False)
+    assert workload.accept_storm not in [f for f, _ in workload.scenarios]
+    assert workload.browse_feed in [f for f, _ in workload.scenarios]
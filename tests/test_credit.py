@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+from server_main import CreditAggregator, compute_credit_score
+
+
+def stats(**counts):
+    return {**dict.fromkeys(CreditAggregator.COUNTERS, 0), **counts}
+
+
+def test_new_user_starts_at_fifty():
+    assert compute_credit_score(stats()) == Decimal("50.00")
+
+
+def test_completion_rate_raises_score():
+    assert compute_credit_score(stats(accepted=10, completed=10)) > compute_credit_score(stats(accepted=10, completed=5))
+
+
+def test_overdue_and_cancellations_lower_score():
+    base = stats(published=10, accepted=10, completed=10)
+    assert compute_credit_score({**base, "overdue": 3}) < compute_credit_score(base)
+    assert compute_credit_score({**base, "cancelled": 5}) < compute_credit_score(base)
+
+
+def test_score_is_clamped_and_rounded_to_cents():
+    assert compute_credit_score(stats(accepted=5, overdue=50, published=1, cancelled=50)) == Decimal("0.00")
+    assert compute_credit_score(stats(accepted=1000, completed=1000)) <= Decimal("100")
+    assert compute_credit_score(stats(accepted=1, completed=0)).as_tuple().exponent == -2
+
+
+
+def test_event_deltas_count_each_event_once_for_the_right_user():
+    orders = {
+        1: {"id": 1, "publisherId": "p1", "runnerId": "r1"},
+        2: {"id": 2, "publisherId": "p1", "runnerId": None},
+    }
+    payloads = [
+        {"jobId": 10, "orderId": 1, "event": "ACCEPTED"},
+        {"jobId": 11, "orderId": 1, "event": "COMPLETED"},
+        {"jobId": 12, "orderId": 2, "event": "PUBLISHED"},
+        {"jobId": 13, "orderId": 2, "event": "EXPIRED"},
+        {"jobId": 14, "orderId": 99, "event": "CANCELLED"},
+    ]
+    deltas = CreditAggregator(db=None).event_deltas(payloads, orders)
+    assert deltas == {
+        "r1": stats(accepted=1, completed=1),
+        "p1": stats(published=1),
+    }
@@ -0,0 +1,60 @@
+import asyncio
+
+import databases
+
+from server_main import InstrumentedDatabase
+
+
+def run_with_db(tmp_path, body):
+    async def run():
+        db = InstrumentedDatabase(databases.Database(f"sqlite:///{tmp_path / 'test.db'}"), name="test")
+        await db.connect()
+        try:
+            await db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, owner TEXT)")
+            for i in range(1, 12):
+                await db.execute("INSERT INTO items (id, owner) VALUES (:id, :owner)",
+                                 {"id": i, "owner": "a" if i % 2 else "b"})
+            await body(db)
+        finally:
+            await db.disconnect()
+
+    asyncio.run(run())
+
+
+def test_iterate_by_key_pages_through_all_rows(tmp_path):
+    async def body(db):
+        rows = [r["id"] async for r in db.iterate_by_key(
+            "SELECT * FROM items", "owner = :owner", {"owner": "a"}, batch_size=2, query_name="t")]
+        assert rows == [1, 3, 5, 7, 9, 11]
+        # 每页一次查询: 6 行 / 每页 2 行 -> 3 页 + 1 次空页
+        assert db.query_stats["t"].latency.count == 4
+
+    run_with_db(tmp_path, body)
+
+
+def test_iterate_by_key_descending(tmp_path):
+    async def body(db):
+        rows = [r["id"] async for r in db.iterate_by_key(
+            "SELECT * FROM items", "owner = :owner", {"owner": "b"}, batch_size=3, descending=True)]
+        assert rows == [10, 8, 6, 4, 2]
+
+    run_with_db(tmp_path, body)
+
+
+class SlowDatabase:
+    async def fetch_all(self, query, values):
+        await asyncio.sleep(10)
+
+
+def test_cancelled_query_propagates_cancellation_and_counts_as_error():
+    async def run():
+        db = InstrumentedDatabase(SlowDatabase(), name="test")
+        task = asyncio.create_task(db.fetch_all("SELECT 1", query_name="slow"))
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert task.cancelled()
+        assert db.query_stats["slow"].errors == 1
+        assert db.query_stats["slow"].rows == 0
+
+    asyncio.run(run())
@@ -0,0 +1,95 @@
+import asyncio
+
+import server_main
+from server_main import DispatchEngine, InProcessBackend
+
+
+class FakeWebSocket:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+        self.closed = False
+
+    async def send_json(self, data):
+        await asyncio.sleep(self.delay)
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.closed = True
+
+
+def status(runner_id, **fields):
+    return {"runnerId": runner_id, "online": True, **fields}
+
+
+TASK = {"id": 1, "type": "EXPRESS_DELIVERY", "location": "菜鸟驿站", "publisherId": "publisher"}
+
+
+def test_rank_prefers_nearby_matching_runners(monkeypatch):
+    monkeypatch.setattr(server_main, "DISPATCH_TOP_K", 2)
+
+    async def run():
+        engine = DispatchEngine(InProcessBackend())
+        await engine.on_runner_status(status("near", location="菜鸟驿站", taskTypes=["EXPRESS_DELIVERY"]))
+        await engine.on_runner_status(status("partial", location="东区菜鸟驿站"))
+        await engine.on_runner_status(status("far", location="图书馆", taskTypes=["FOOD_DELIVERY"]))
+        await engine.on_runner_status(status("busy", location="菜鸟驿站", available=False))
+        await engine.on_runner_status(status("publisher", location="菜鸟驿站"))
+        return [runner_id for _, runner_id in engine.rank(TASK)]
+
+    assert asyncio.run(run()) == ["near", "partial"]
+
+
+def test_rank_skips_runners_without_recent_heartbeat():
+    async def run():
+        engine = DispatchEngine(InProcessBackend())
+        await engine.on_runner_status(status("stale", location="菜鸟驿站"))
+        engine.runners["stale"].last_seen -= server_main.DISPATCH_RUNNER_TTL + 1
+        await engine.on_runner_status(status("fresh", location="图书馆"))
+        return [runner_id for _, runner_id in engine.rank(TASK)]
+
+    assert asyncio.run(run()) == ["fresh"]
+
+
+def test_slow_socket_does_not_block_other_runners(monkeypatch):
+    monkeypatch.setattr(server_main, "DISPATCH_SEND_TIMEOUT", 0.2)
+
+    async def run():
+        backend = InProcessBackend()
+        engine = DispatchEngine(backend)
+        offline = []
+
+        async def on_status(message):
+            if not message.get("online", True):
+                offline.append(message["runnerId"])
+
+        backend.subscribe(DispatchEngine.STATUS_CHANNEL, on_status)
+        slow, fast = FakeWebSocket(delay=10), FakeWebSocket()
+        engine.connections.update({"slow": slow, "fast": fast})
+
+        await asyncio.wait_for(backend.publish(DispatchEngine.OFFER_CHANNEL, {
+            "task": TASK, "runnerIds": ["slow", "fast"], "scores": {"slow": 0.9, "fast": 0.8},
+        }), timeout=0.1)
+        await asyncio.sleep(0.05)
+        assert fast.sent == [{"type": "task_offer", "task": TASK, "score": 0.8}]
+        assert "slow" in engine.connections
+
+        await asyncio.sleep(0.3)
+        assert "slow" not in engine.connections
+        assert slow.closed and slow.sent == []
+        assert offline == ["slow"]
+        assert engine.offers_sent == 1
+
+    asyncio.run(run())
+
+
+def test_failed_send_keeps_newer_connection():
+    async def run():
+        engine = DispatchEngine(InProcessBackend())
+        old, new = FakeWebSocket(), FakeWebSocket()
+        engine.connections["runner"] = new
+        await engine.drop_connection("runner", old)
+        assert engine.connections["runner"] is new
+        assert not old.closed
+
+    asyncio.run(run())
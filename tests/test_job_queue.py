@@ -0,0 +1,34 @@
+import asyncio
+
+import databases
+
+from server_main import InstrumentedDatabase, JobQueue
+
+
+def test_process_passes_job_ids_and_deletes_done_jobs(tmp_path):
+    async def run():
+        db = InstrumentedDatabase(databases.Database(f"sqlite:///{tmp_path / 'jobs.db'}"), name="test")
+        await db.connect()
+        try:
+            await db.execute(
+                "CREATE TABLE job_queue (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT, payload TEXT, status TEXT, "
+                "attempts INT, runAt TEXT, lockedBy TEXT, lockedAt TEXT, lastError TEXT, createdAt TEXT)"
+            )
+            queue = JobQueue(db)
+            received = []
+
+            async def handler(payloads):
+                received.extend(payloads)
+
+            queue.register("order_event", handler)
+            await queue.enqueue_many("order_event", [{"orderId": 1}, {"orderId": 2}])
+            jobs = [dict(r) for r in await db.fetch_all("SELECT id, kind, payload, attempts FROM job_queue")]
+            await queue._process(jobs)
+
+            assert sorted((p["orderId"], p["jobId"]) for p in received) == [(1, jobs[0]["id"]), (2, jobs[1]["id"])]
+            assert await db.fetch_val("SELECT COUNT(*) FROM job_queue") == 0
+            assert queue.processed["order_event"] == 2
+        finally:
+            await db.disconnect()
+
+    asyncio.run(run())
@@ -0,0 +1,43 @@
+import server_main
+from server_main import _redact_sql, _summarize_params, group_metric_families
+
+
+def test_families_are_contiguous_with_single_type_line():
+    lines = [
+        "# TYPE db_query_duration_seconds histogram",
+        "# TYPE db_query_rows_total counter",
+        'db_query_duration_seconds_bucket{db="primary",le="+Inf"} 1',
+        'db_query_duration_seconds_count{db="primary"} 1',
+        'db_query_rows_total{db="primary"} 3',
+        "# TYPE replica_healthy gauge",
+        "replica_healthy 1",
+        'db_query_duration_seconds_bucket{db="replica",le="+Inf"} 2',
+        'db_query_rows_total{db="replica"} 5',
+        "# TYPE replica_healthy gauge",
+    ]
+    assert group_metric_families(lines) == [
+        "# TYPE db_query_duration_seconds histogram",
+        'db_query_duration_seconds_bucket{db="primary",le="+Inf"} 1',
+        'db_query_duration_seconds_count{db="primary"} 1',
+        'db_query_duration_seconds_bucket{db="replica",le="+Inf"} 2',
+        "# TYPE db_query_rows_total counter",
+        'db_query_rows_total{db="primary"} 3',
+        'db_query_rows_total{db="replica"} 5',
+        "# TYPE replica_healthy gauge",
+        "replica_healthy 1",
+    ]
+
+
+def test_redact_sql_strips_literals_and_whitespace():
+    sql = """
+        SELECT * FROM users
+        WHERE name = 'O''Brien' AND note = "x" AND age > 30 AND id IN (:u0, :u12) LIMIT 500
+    """
+    assert _redact_sql(sql) == "SELECT * FROM users WHERE name = ? AND note = ? AND age > ? AND id IN (:u0, :u12) LIMIT ?"
+
+
+def test_slow_query_params_are_truncated(monkeypatch):
+    monkeypatch.setattr(server_main, "SLOW_QUERY_MAX_PARAMS", 3)
+    assert _summarize_params({"b": 1, "a": 2}) == "['a', 'b']"
+    assert _summarize_params({f"p{i}": i for i in range(10)}) == "['p0', 'p1', 'p2'] (+7 more)"
+    assert _summarize_params(None) == "[]"
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+
+import databases
+import pytest
+from pydantic import ValidationError
+
+from server_main import (
+    OPENING_BALANCE_ENTRIES, AddBalanceRequest, InstrumentedDatabase, SubtractBalanceRequest, TaskRequest,
+    money_column_definition, to_money, to_price,
+)
+
+
+@pytest.mark.parametrize("value, expected", [
+    (0.1 + 0.2, Decimal("0.30")),
+    ("12.345", Decimal("12.35")),
+    (Decimal("-1.005"), Decimal("-1.01")),
+    (7, Decimal("7.00")),
+])
+def test_to_money_rounds_to_cents(value, expected):
+    assert to_money(value) == expected
+
+
+def test_to_money_passes_none_through():
+    assert to_money(None) is None
+
+
+@pytest.mark.parametrize("value", [1e30, "1E+30", "NaN", "Infinity", "abc"])
+def test_to_money_rejects_out_of_range(value):
+    with pytest.raises(ValueError):
+        to_money(value)
+
+
+def test_request_models_return_validation_error_for_huge_amounts():
+    with pytest.raises(ValidationError):
+        AddBalanceRequest(userId="u1", amount=1e30)
+    with pytest.raises(ValidationError):
+        SubtractBalanceRequest(amount="1E+30")
+    assert SubtractBalanceRequest(amount="10.005").amount == Decimal("10.01")
+
+
+def test_price_is_bounded_by_order_column():
+    assert to_price("99999999.99") == Decimal("99999999.99")
+    with pytest.raises(ValueError):
+        to_price("100000000")
+    with pytest.raises(ValidationError):
+        TaskRequest(title="t", price="500000000", type="FOOD_DELIVERY", location="a", destination="b")
+
+
+def test_money_column_definition_keeps_column_attributes():
+    column = {"IS_NULLABLE": "NO", "COLUMN_DEFAULT": "0", "COLUMN_COMMENT": "user's balance"}
+    assert money_column_definition("DECIMAL(12, 2)", column) == "DECIMAL(12, 2) NOT NULL DEFAULT '0' COMMENT 'user''s balance'"
+    column = {"IS_NULLABLE": "YES", "COLUMN_DEFAULT": None, "COLUMN_COMMENT": ""}
+    assert money_column_definition("DECIMAL(6, 2)", column) == "DECIMAL(6, 2) NULL"
+
+
+def test_opening_entry_accounts_for_ledger_rows_written_before_migrate(tmp_path):
+    async def run():
+        db = InstrumentedDatabase(databases.Database(f"sqlite:///{tmp_path / 'money.db'}"), name="test")
+        await db.connect()
+        try:
+            await db.execute("CREATE TABLE users (id TEXT PRIMARY KEY, balance NUMERIC)")
+            await db.execute("CREATE TABLE balance_ledger (id INTEGER PRIMARY KEY, userId TEXT, amount NUMERIC, "
+                             "kind TEXT, createdAt TIMESTAMP)")
+            await db.execute("INSERT INTO users VALUES ('u1', 150), ('u2', 20)")
+            # u1 在 migrate 之前充值了 50, 余额已包含这笔充值
+            await db.execute("INSERT INTO balance_ledger (userId, amount, kind, createdAt) "
+                             "VALUES ('u1', 50, 'DEPOSIT', :now)", {"now": datetime.now()})
+            for _ in range(2):
+                await db.execute(OPENING_BALANCE_ENTRIES, {"now": datetime.now()})
+            rows = await db.fetch_all("SELECT userId, SUM(amount) AS total, COUNT(*) AS n FROM balance_ledger GROUP BY userId")
+            assert {r["userId"]: (r["total"], r["n"]) for r in rows} == {"u1": (150, 2), "u2": (20, 1)}
+        finally:
+            await db.disconnect()
+
+    asyncio.run(run())
@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+import pytest
+from starlette.requests import Request
+
+import server_main
+from server_main import TokenBucketLimiter, create_access_token, decode_token_subject, get_client_ip
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(server_main.time, "monotonic", fake)
+    return fake
+
+
+def make_request(client_host="10.0.0.9", forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": (client_host, 1234)})
+
+
+def test_bucket_allows_burst_then_rejects(clock):
+    limiter = TokenBucketLimiter(capacity=3, refill_rate=1)
+    assert [limiter.acquire("k") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("k") == pytest.approx(1.0)
+    assert (limiter.allowed, limiter.rejected) == (3, 1)
+
+
+def test_bucket_refills_over_time_and_keys_are_independent(clock):
+    limiter = TokenBucketLimiter(capacity=1, refill_rate=0.5)
+    assert limiter.acquire("a") == 0.0
+    assert limiter.acquire("a") == pytest.approx(2.0)
+    assert limiter.acquire("b") == 0.0
+    clock.now += 2
+    assert limiter.acquire("a") == 0.0
+
+
+def test_prune_drops_only_refilled_buckets(clock):
+    limiter = TokenBucketLimiter(capacity=2, refill_rate=1)
+    limiter.acquire("old")
+    clock.now += 5
+    limiter.acquire("new")
+    limiter._prune(clock.now)
+    assert set(limiter._buckets) == {"new"}
+
+
+def test_client_ip_ignores_forwarded_header_by_default(monkeypatch):
+    monkeypatch.setattr(server_main, "TRUST_FORWARDED_FOR", False)
+    assert get_client_ip(make_request(forwarded="1.1.1.1")) == "10.0.0.9"
+
+
+def test_client_ip_uses_address_appended_by_trusted_proxy(monkeypatch):
+    monkeypatch.setattr(server_main, "TRUST_FORWARDED_FOR", True)
+    monkeypatch.setattr(server_main, "TRUSTED_PROXY_HOPS", 1)
+    # 最左侧的地址由客户端伪造, 最右侧由代理追加
+    assert get_client_ip(make_request(forwarded="6.6.6.6, 203.0.113.7")) == "203.0.113.7"
+    monkeypatch.setattr(server_main, "TRUSTED_PROXY_HOPS", 2)
+    assert get_client_ip(make_request(forwarded="6.6.6.6, 203.0.113.7, 10.1.1.1")) == "203.0.113.7"
+    assert get_client_ip(make_request(forwarded="203.0.113.7")) == "203.0.113.7"
+
+
+def test_token_subject_is_decoded_once_per_request(monkeypatch):
+    token = create_access_token({"sub": "user-1"}, timedelta(minutes=5))
+    request = make_request()
+    assert decode_token_subject(request, token) == "user-1"
+    monkeypatch.setattr(server_main.jwt, "decode", lambda *a, **k: pytest.fail("decoded twice"))
+    assert decode_token_subject(request, token) == "user-1"
+
+
+def test_invalid_token_has_no_subject():
+    assert decode_token_subject(make_request(), "not-a-jwt") is None
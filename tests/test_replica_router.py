@@ -0,0 +1,55 @@
+import asyncio
+
+import server_main
+from server_main import InProcessBackend, ReplicaRouter
+
+
+class FailingBackend(InProcessBackend):
+    async def cache_set(self, key, value, ttl):
+        raise ConnectionError("shared state down")
+
+    async def cache_get(self, key):
+        raise ConnectionError("shared state down")
+
+
+def make_router():
+    router = ReplicaRouter(primary=object(), replica_url=None)
+    router.replica = object()
+    router.healthy = True
+    return router
+
+
+def test_recent_writer_reads_from_primary(monkeypatch):
+    async def run():
+        monkeypatch.setattr(server_main, "shared_state", InProcessBackend())
+        router = make_router()
+        await router.mark_write("u1")
+        assert await router.for_read("u1") is router.primary
+        assert await router.for_read("u2") is router.replica
+        assert await router.for_read() is router.replica
+
+    asyncio.run(run())
+
+
+def test_feed_refill_after_invalidation_reads_from_primary(monkeypatch):
+    async def run():
+        monkeypatch.setattr(server_main, "shared_state", InProcessBackend())
+        router = make_router()
+        monkeypatch.setattr(server_main, "db_router", router)
+        assert await router.for_read(feed=True) is router.replica
+        await server_main.invalidate_feed_cache()
+        assert await router.for_read(feed=True) is router.primary
+        assert await router.for_read() is router.replica
+
+    asyncio.run(run())
+
+
+def test_shared_state_failure_does_not_fail_writes(monkeypatch):
+    async def run():
+        monkeypatch.setattr(server_main, "shared_state", FailingBackend())
+        router = make_router()
+        await router.mark_write("u1")
+        # 无法确认是否刚写过时走主库
+        assert await router.for_read("u1") is router.primary
+
+    asyncio.run(run())
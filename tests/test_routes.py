@@ -0,0 +1,34 @@
+from fastapi.routing import APIRoute
+from starlette.routing import Match
+
+from server_main import app
+
+
+def matched_route(path: str, method: str = "GET") -> str:
+    scope = {"type": "http", "path": path, "method": method}
+    for route in app.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return None
+
+
+def test_static_order_routes_are_not_shadowed_by_order_id():
+    for path in ("/orders/stats", "/orders/export", "/orders/batch", "/orders/published", "/orders/accepted"):
+        assert matched_route(path) == path
+
+
+def test_order_detail_still_matches():
+    assert matched_route("/orders/42") == "/orders/{orderId}"
+
+
+def test_api_routes_are_rate_limited():
+    # 健康检查、指标和静态页面之外的接口都必须挂限流依赖
+    exempt = {"/healthz", "/readyz", "/metrics", "/message", "/index"}
+    unlimited = []
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or route.path in exempt or route.path.startswith(("/docs", "/openapi", "/redoc")):
+            continue
+        if not any(d.dependency.__name__ == "check_rate_limit" for d in route.dependencies):
+            unlimited.append(f"{sorted(route.methods)} {route.path}")
+    assert unlimited == []
@@ -0,0 +1,44 @@
+import asyncio
+
+import server_main
+
+
+class FakeSchemaDatabase:
+    """information_schema 查询按已有的列/索引回答, 记录执行的 ALTER"""
+
+    def __init__(self, columns=(), indexes=()):
+        self.columns = set(columns)
+        self.indexes = set(indexes)
+        self.executed = []
+
+    async def fetch_val(self, query, values=None):
+        if "information_schema.columns" in query:
+            return int("jobId" in self.columns)
+        return int(values["index"] in self.indexes)
+
+    async def execute(self, query, values=None):
+        self.executed.append(query)
+
+
+def test_job_key_is_added_when_column_exists_but_key_is_missing(monkeypatch):
+    db = FakeSchemaDatabase(columns={"jobId"})
+    monkeypatch.setattr(server_main, "database", db)
+    asyncio.run(server_main.ensure_system_messages_job_key())
+    assert db.executed == ["ALTER TABLE system_messages ADD UNIQUE INDEX uq_system_messages_job (jobId, userId)"]
+
+
+def test_job_key_migration_is_skipped_when_complete(monkeypatch):
+    db = FakeSchemaDatabase(columns={"jobId"}, indexes={"uq_system_messages_job"})
+    monkeypatch.setattr(server_main, "database", db)
+    asyncio.run(server_main.ensure_system_messages_job_key())
+    assert db.executed == []
+
+
+def test_job_key_migration_from_scratch(monkeypatch):
+    db = FakeSchemaDatabase()
+    monkeypatch.setattr(server_main, "database", db)
+    asyncio.run(server_main.ensure_system_messages_job_key())
+    assert db.executed == [
+        "ALTER TABLE system_messages ADD COLUMN jobId BIGINT NULL",
+        "ALTER TABLE system_messages ADD UNIQUE INDEX uq_system_messages_job (jobId, userId)",
+    ]
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from server_main import SearchHistoryBuffer, merge_pending_history
+
+
+class RecordingBuffer(SearchHistoryBuffer):
+    def __init__(self, fail=False):
+        super().__init__(db=None)
+        self.written = []
+        self.fail = fail
+        self.release = None
+
+    async def _write(self, pending):
+        if self.release is not None:
+            await self.release.wait()
+        if self.fail:
+            self._restore(pending)
+            raise ConnectionError("database down")
+        self.written.append({u: dict(e) for u, e in pending.items()})
+
+
+def test_repeated_searches_are_coalesced():
+    buffer = RecordingBuffer()
+    t0 = datetime(2024, 1, 1)
+    buffer.add("u1", "coffee", t0)
+    buffer.add("u1", "coffee", t0 + timedelta(seconds=5))
+    buffer.add("u1", "tea", t0)
+    buffer.add("u2", "coffee", t0)
+    assert buffer._size == 3
+    assert buffer._pending["u1"]["coffee"] == [2, t0 + timedelta(seconds=5), t0]
+
+    asyncio.run(buffer.flush())
+    assert buffer._size == 0 and not buffer.has_pending("u1")
+    assert buffer.written[0]["u1"]["coffee"][0] == 2
+
+
+def test_discard_single_keyword():
+    buffer = RecordingBuffer()
+    buffer.add("u1", "Coffee", datetime.now())
+    buffer.add("u1", "tea", datetime.now())
+    buffer.discard_user("u1", "coffee")
+    assert list(buffer._pending["u1"]) == ["tea"] and buffer._size == 1
+    buffer.discard_user("u1")
+    assert not buffer.has_pending("u1") and buffer._size == 0
+
+
+def test_history_page_merges_buffered_searches():
+    t0 = datetime(2024, 1, 1)
+    page = [
+        {"id": 1, "userId": "u1", "keyword": "tea", "searchCount": 2, "lastSearchedAt": t0 + timedelta(hours=2), "createdAt": t0},
+        {"id": 2, "userId": "u1", "keyword": "cola", "searchCount": 1, "lastSearchedAt": t0 + timedelta(hours=1), "createdAt": t0},
+    ]
+    # coffee 在数据库中有一条较早的记录, 不在当前页中
+    stored = [{"id": 3, "userId": "u1", "keyword": "Coffee", "searchCount": 4, "lastSearchedAt": t0, "createdAt": t0}]
+    pending = {
+        "coffee": (2, t0 + timedelta(hours=3), t0 + timedelta(hours=3)),
+        "noodles": (1, t0 + timedelta(hours=4), t0 + timedelta(hours=4)),
+    }
+    histories, total = merge_pending_history("u1", page, stored, pending, total=3, limit=3)
+    assert [(h.id, h.keyword, h.searchCount) for h in histories] == [(None, "noodles", 1), (3, "Coffee", 6), (1, "tea", 2)]
+    assert total == 4
+
+
+def test_history_without_pending_entries_is_unchanged():
+    t0 = datetime(2024, 1, 1)
+    page = [{"id": 1, "userId": "u1", "keyword": "tea", "searchCount": 2, "lastSearchedAt": t0, "createdAt": t0}]
+    histories, total = merge_pending_history("u1", page, [], {}, total=7, limit=10)
+    assert [h.id for h in histories] == [1] and total == 7
+
+
+def test_discard_waits_for_in_flight_flush():
+    async def run():
+        buffer = RecordingBuffer(fail=True)
+        buffer.release = asyncio.Event()
+        buffer.add("u1", "coffee", datetime.now())
+        flushing = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0)
+
+        async def clear():
+            async with buffer.user_lock("u1"):
+                buffer.discard_user("u1")
+
+        clearing = asyncio.create_task(clear())
+        await asyncio.sleep(0)
+        assert not clearing.done()
+        buffer.release.set()
+        await asyncio.gather(flushing, return_exceptions=True)
+        await clearing
+        # 刷盘失败放回的数据也被清空, 不会在下次刷盘时重新写入
+        assert not buffer.has_pending("u1") and buffer._size == 0
+
+    asyncio.run(run())
@@ -0,0 +1,39 @@
+import asyncio
+
+import server_main
+from server_main import InProcessBackend
+
+
+def test_incr_is_visible_to_cache_get():
+    async def run():
+        backend = InProcessBackend()
+        assert await backend.cache_get("feed:version") is None
+        assert await backend.incr("feed:version") == 1
+        assert await backend.incr("feed:version") == 2
+        assert await backend.cache_get("feed:version") == "2"
+
+    asyncio.run(run())
+
+
+def test_invalidate_feed_cache_changes_key(monkeypatch):
+    async def run():
+        monkeypatch.setattr(server_main, "shared_state", InProcessBackend())
+        before = await server_main.feed_cache_key(1, 20, None)
+        await server_main.invalidate_feed_cache()
+        after = await server_main.feed_cache_key(1, 20, None)
+        assert before != after
+
+    asyncio.run(run())
+
+
+def test_counters_survive_cache_purge():
+    async def run():
+        backend = InProcessBackend()
+        backend.max_entries = 2
+        await backend.incr("feed:version")
+        await backend.cache_set("a", "1", -1)
+        await backend.cache_set("b", "1", -1)
+        await backend.cache_set("c", "1", 10)
+        assert await backend.cache_get("feed:version") == "1"
+
+    asyncio.run(run())
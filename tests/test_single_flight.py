@@ -0,0 +1,81 @@
+import asyncio
+
+from server_main import SingleFlight
+
+
+class Query:
+    """记录执行次数, 在 release 之前一直阻塞, 模拟慢查询"""
+
+    def __init__(self, result="rows"):
+        self.result = result
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    async def run():
+        flight = SingleFlight({"tasks"})
+        query = Query()
+        waiters = [asyncio.ensure_future(flight.do("tasks", "k", query)) for _ in range(5)]
+        await asyncio.sleep(0)
+        query.release.set()
+        assert await asyncio.gather(*waiters) == ["rows"] * 5
+        assert query.calls == 1
+        assert flight.executed["tasks"] == 1 and flight.shared["tasks"] == 4
+        # 完成后不再复用旧结果
+        query.release = asyncio.Event()
+        query.release.set()
+        await flight.do("tasks", "k", query)
+        assert query.calls == 2
+
+    asyncio.run(run())
+
+
+def test_different_keys_and_disabled_endpoints_are_not_shared():
+    async def run():
+        flight = SingleFlight({"tasks"})
+        query = Query()
+        query.release.set()
+        await asyncio.gather(flight.do("tasks", "a", query), flight.do("tasks", "b", query))
+        await asyncio.gather(flight.do("other", "a", query), flight.do("other", "a", query))
+        assert query.calls == 4
+
+    asyncio.run(run())
+
+
+def test_cancelling_one_waiter_does_not_cancel_the_others():
+    async def run():
+        flight = SingleFlight({"tasks"})
+        query = Query()
+        first = asyncio.ensure_future(flight.do("tasks", "k", query))
+        second = asyncio.ensure_future(flight.do("tasks", "k", query))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        query.release.set()
+        assert await second == "rows"
+        assert first.cancelled()
+        assert query.calls == 1
+
+    asyncio.run(run())
+
+
+def test_errors_reach_every_waiter():
+    async def run():
+        flight = SingleFlight({"tasks"})
+        query = Query(result=RuntimeError("db down"))
+        waiters = [asyncio.ensure_future(flight.do("tasks", "k", query)) for _ in range(3)]
+        await asyncio.sleep(0)
+        query.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert query.calls == 1
+
+    asyncio.run(run())
@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+import server_main
+
+
+@pytest.fixture
+def app_state(monkeypatch):
+    state = {"ready": False, "import_seconds": None, "startup_seconds": None, "reconnect_task": None, "services": {}}
+    monkeypatch.setattr(server_main, "app_state", state)
+
+    async def no_warm_up():
+        pass
+
+    monkeypatch.setattr(server_main, "warm_up", no_warm_up)
+    return state
+
+
+def test_failed_service_keeps_process_not_ready_and_is_retried(monkeypatch, app_state):
+    calls = {"ok": 0, "flaky": 0}
+
+    async def ok():
+        calls["ok"] += 1
+
+    async def flaky():
+        calls["flaky"] += 1
+        if calls["flaky"] == 1:
+            raise RuntimeError("DDL not supported")
+
+    monkeypatch.setattr(server_main, "startup_steps", lambda: [("ok", ok), ("sync", lambda: None), ("flaky", flaky)])
+
+    assert asyncio.run(server_main.start_services()) is False
+    assert app_state["ready"] is False
+    assert app_state["services"]["flaky"].startswith("failed")
+
+    assert asyncio.run(server_main.start_services()) is True
+    assert app_state["ready"] is True
+    # 已经启动成功的服务不会重复启动
+    assert calls == {"ok": 1, "flaky": 2}
@@ -0,0 +1,96 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import databases
+
+import server_main
+from server_main import InProcessBackend, InstrumentedDatabase, SuggestionIndex, UserKeywordCache
+
+
+def run_with_history(tmp_path, rows, body):
+    async def run():
+        db = InstrumentedDatabase(databases.Database(f"sqlite:///{tmp_path / 'suggest.db'}"), name="test")
+        await db.connect()
+        try:
+            await db.execute(
+                "CREATE TABLE search_history (id INTEGER PRIMARY KEY, userId TEXT, keyword TEXT, "
+                "searchCount INT, lastSearchedAt TIMESTAMP)"
+            )
+            for user_id, keyword, count, at in rows:
+                await insert(db, user_id, keyword, count, at)
+            await body(db, SuggestionIndex(db))
+        finally:
+            await db.disconnect()
+
+    asyncio.run(run())
+
+
+async def insert(db, user_id, keyword, count, at):
+    await db.execute(
+        "INSERT INTO search_history (userId, keyword, searchCount, lastSearchedAt) VALUES (:u, :k, :c, :t)",
+        {"u": user_id, "k": keyword, "c": count, "t": at},
+    )
+
+
+def popular(keyword, users=3, count=2, at=None):
+    return [(f"user{i}", keyword, count, at or datetime.now()) for i in range(users)]
+
+
+def test_private_keywords_are_not_suggested(tmp_path, monkeypatch):
+    monkeypatch.setattr(server_main, "SUGGEST_MIN_USERS", 3)
+    monkeypatch.setattr(server_main, "SUGGEST_MIN_COUNT", 5)
+    rows = popular("coffee") + [("user0", "cough medicine", 50, datetime.now())] + popular("cola", users=3, count=1)
+
+    async def body(db, index):
+        await index.load()
+        assert index.suggest("co", 10) == [("coffee", 6)]
+        # 本进程的新搜索只累加已收录的词
+        index.observe("cough medicine")
+        index.observe("Coffee")
+        assert index.suggest("co", 10) == [("coffee", 7)]
+
+    run_with_history(tmp_path, rows, body)
+
+
+def test_index_size_is_bounded_by_search_count(tmp_path, monkeypatch):
+    monkeypatch.setattr(server_main, "SUGGEST_MIN_USERS", 1)
+    monkeypatch.setattr(server_main, "SUGGEST_MIN_COUNT", 1)
+    monkeypatch.setattr(server_main, "SUGGEST_INDEX_SIZE", 2)
+    rows = popular("tea", count=1) + popular("taxi", count=3)
+
+    async def body(db, index):
+        await index.load()
+        for user_id, keyword, count, at in popular("toast", count=5):
+            await insert(db, user_id, keyword, count, at)
+        await index.refresh()
+        assert [kw for kw, _ in index.suggest("t", 10)] == ["toast", "taxi"]
+
+    run_with_history(tmp_path, rows, body)
+
+
+def test_refresh_picks_up_rows_flushed_late(tmp_path, monkeypatch):
+    monkeypatch.setattr(server_main, "SUGGEST_MIN_USERS", 1)
+    monkeypatch.setattr(server_main, "SUGGEST_MIN_COUNT", 1)
+
+    async def body(db, index):
+        await index.load()
+        # 缓冲在刷新之后才写库, 但 lastSearchedAt 是刷新之前的搜索时间
+        await insert(db, "user0", "noodles", 1, datetime.now() - timedelta(seconds=5))
+        await index.refresh()
+        assert index.suggest("noo", 10) == [("noodles", 1)]
+
+    run_with_history(tmp_path, [], body)
+
+
+def test_history_cache_invalidation_reaches_every_worker():
+    async def run():
+        backend = InProcessBackend()
+        # 同一个共享后端上的两个 worker
+        workers = [UserKeywordCache(db=None, backend=backend) for _ in range(2)]
+        for cache in workers:
+            cache._users["u1"] = (time.monotonic(), {"secret": 1})
+        await workers[0].invalidate("u1")
+        assert all("u1" not in cache._users for cache in workers)
+
+    asyncio.run(run())
@@ -0,0 +1,81 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import server_main
+from benchmark_server import apply_schema
+from server_main import InProcessBackend, OrderSweeper
+
+
+class FakeJobQueue:
+    def __init__(self):
+        self.jobs = []
+
+    async def enqueue_many(self, kind, payloads):
+        self.jobs += [(kind, p) for p in payloads]
+
+
+async def insert_order(db, status, age_minutes, estimated_time=None):
+    at = datetime.now().replace(microsecond=0) - timedelta(minutes=age_minutes)
+    return await db.execute(
+        "INSERT INTO orders (title, price, type, status, location, destination, estimatedTime, "
+        "publisherId, publisherName, runnerId, createdAt, updatedAt) "
+        "VALUES ('t', 1, 'OTHER', :status, 'a', 'b', :estimated, 'p', 'n', 'r', :at, :at)",
+        {"status": status, "estimated": estimated_time, "at": at},
+    )
+
+
+async def prepare(db, monkeypatch):
+    monkeypatch.setattr(server_main, "job_queue", FakeJobQueue())
+    monkeypatch.setattr(server_main, "shared_state", InProcessBackend())
+    await db.connect()
+    await apply_schema(db, "sqlite://")
+    await db.execute(OrderSweeper.CREATE_TABLE)
+    await db.execute(OrderSweeper.CREATE_EXPIRED_TABLE)
+
+
+def test_sweep_cancels_expired_pending_orders(mysql_on_sqlite, monkeypatch):
+    async def run():
+        db = mysql_on_sqlite
+        await prepare(db, monkeypatch)
+        try:
+            expired = await insert_order(db, "PENDING", age_minutes=180, estimated_time=30)
+            within_estimate = await insert_order(db, "PENDING", age_minutes=180, estimated_time=90)
+            no_estimate = await insert_order(db, "PENDING", age_minutes=180)
+            await insert_order(db, "COMPLETED", age_minutes=180, estimated_time=30)
+
+            sweeper = OrderSweeper(db)
+            await sweeper.sweep()
+            await sweeper.sweep()
+
+            statuses = {r["id"]: r["status"] for r in await db.fetch_all("SELECT id, status FROM orders")}
+            assert statuses[expired] == "CANCELLED"
+            assert statuses[within_estimate] == statuses[no_estimate] == "PENDING"
+            assert [r["orderId"] for r in await db.fetch_all("SELECT orderId FROM expired_orders")] == [expired]
+            assert server_main.job_queue.jobs == [("order_event", {"orderId": expired, "event": "EXPIRED"})]
+            assert sweeper.expired == 1
+        finally:
+            await db.disconnect()
+
+    asyncio.run(run())
+
+
+def test_sweep_flags_overdue_orders_once_without_changing_status(mysql_on_sqlite, monkeypatch):
+    async def run():
+        db = mysql_on_sqlite
+        await prepare(db, monkeypatch)
+        try:
+            overdue = await insert_order(db, "IN_PROGRESS", age_minutes=180, estimated_time=30)
+            await insert_order(db, "IN_PROGRESS", age_minutes=60, estimated_time=30)
+
+            sweeper = OrderSweeper(db)
+            await sweeper.sweep()
+            await sweeper.sweep()
+
+            assert await db.fetch_val("SELECT status FROM orders WHERE id = :id", {"id": overdue}) == "IN_PROGRESS"
+            assert [r["orderId"] for r in await db.fetch_all("SELECT orderId FROM overdue_orders")] == [overdue]
+            assert server_main.job_queue.jobs == [("order_event", {"orderId": overdue, "event": "OVERDUE"})]
+            assert sweeper.flagged == 1
+        finally:
+            await db.disconnect()
+
+    asyncio.run(run())